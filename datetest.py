@@ -1,22 +1,40 @@
-import os
-import pathlib
-from dotenv import load_dotenv
-import oracledb
-import pandas as pd
-from datetime import datetime, timedelta, date
+import functools
+from datetime import datetime, timedelta
 import logging
 import sys
-import smtplib
-from email.message import EmailMessage
+
+
+def _previous_month(midnight_today):
+    first_of_this_month = midnight_today.replace(day=1)
+    last_month_end = first_of_this_month - timedelta(days=1)
+    return last_month_end.replace(day=1), first_of_this_month
+
+
+# mode -> callable(midnight_today) -> (start_date, end_date)
+_MODES = {
+    "DAILY": lambda d: (d, d + timedelta(days=1)),
+    "WEEKLY": lambda d: (d - timedelta(days=7), d),
+    "MONTHLY": _previous_month,
+}
+
+
+@functools.lru_cache(maxsize=8)
+def _window(mode, midnight_today):
+    try:
+        return _MODES[mode](midnight_today)
+    except KeyError:
+        raise ValueError("Invalid mode. Choose from 'DAILY', 'WEEKLY', or 'MONTHLY'.") from None
 
 
 # Compute start and end date
-def compute_dates(mode):
+def compute_dates(mode, now=None):
     """
     Computes the start and end dates for a given mode.
 
     Args:
         mode (str): The desired date range mode ('DAILY', 'WEEKLY', 'MONTHLY').
+        now (datetime, optional): The reference time. Defaults to `datetime.now()`;
+               pass one in to evaluate several modes against the same instant.
 
     Returns:
         tuple: A tuple containing the start and end datetime objects,
@@ -26,27 +44,21 @@ def compute_dates(mode):
     # Note: Using `datetime.now()` assumes the system's timezone is correct.
     # For robust timezone handling, a library like `pytz` would be needed.
 
-    now = datetime.now()
+    if now is None:
+        now = datetime.now()
     midnight_today = now.replace(hour=0, minute=0, second=0, microsecond=0)
-    
-
-    if mode.upper() == "DAILY":
-        start_date = midnight_today
-        end_date = midnight_today + timedelta(days=1)
-    elif mode.upper() == "WEEKLY":
-        start_date = midnight_today - timedelta(days=7)
-        end_date = midnight_today
-    elif mode.upper() == "MONTHLY":
-        first_of_this_month = midnight_today.replace(day=1)
-        last_month_end = first_of_this_month - timedelta(days=1)
-        start_date = last_month_end.replace(day=1)
-        end_date = first_of_this_month
-    else:
-        raise ValueError("Invalid mode. Choose from 'DAILY', 'WEEKLY', or 'MONTHLY'.")
-    
-    logging.info(f"window mode: {start_date}, {end_date}")
+
+    start_date, end_date = _window(mode.upper(), midnight_today)
+
+    logging.info("window mode: %s, %s", start_date, end_date)
     return start_date, end_date
 
-for m in ["DAILY", "WEEKLY", "MONTHLY"]:
-    s, e = compute_dates(m)
-    print(f"{m}: {s} → {e}")
\ No newline at end of file
+def compute_all_windows(now=None):
+    """Returns {mode: (start, end)} for every mode, all computed from one `now`."""
+    if now is None:
+        now = datetime.now()
+    return {m: compute_dates(m, now) for m in _MODES}
+
+if __name__ == "__main__":
+    windows = compute_all_windows()
+    sys.stdout.write("\n".join(f"{m}: {s} → {e}" for m, (s, e) in windows.items()) + "\n")
\ No newline at end of file
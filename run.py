@@ -1,25 +1,56 @@
 import os
+import re
+import csv
 import sys
+import gzip
+import mmap
+import shutil
+import itertools
+import subprocess
 import logging
+from logging.handlers import RotatingFileHandler
+import socket
 import smtplib
+from email import policy
 from email.message import EmailMessage
-import pandas as pd
-import oracledb
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, date, time, timezone
+from string import Template
+from pathlib import Path
+from urllib.parse import quote
 from dotenv import load_dotenv
 
+try:
+    import fcntl
+except ImportError:  # Windows (Task Scheduler)
+    fcntl = None
+    import msvcrt
+
+log = logging.getLogger("ses")
+
+# SMTP_TO may separate addresses with commas, semicolons or any whitespace
+_RECIPIENT_SEPARATORS = str.maketrans(",;\t\r\n", "     ")
+# MIME subtypes (under application/) for binary report files
+_ATTACHMENT_SUBTYPES = {".gz": "gzip", ".parquet": "vnd.apache.parquet"}
+# A line over the 998-octet limit for 7bit/8bit MIME bodies
+_LONG_LINE = re.compile(rb"(?m)^[^\r\n]{999}")
+# `SELECT *` / `SELECT t.*` at the start of any (sub)query
+_SELECT_STAR = re.compile(r"\bSELECT\s+(?:DISTINCT\s+)?(?:\w+\.)?\*", re.IGNORECASE)
+
 # ─────────────────────────────
 # 1. Config Loader
 # ─────────────────────────────
 class EnvConfig:
     """Handles environment setup, file paths, and logging configuration."""
-    def __init__(self):
+    def __init__(self, now: datetime | None = None):
         self.root = os.path.dirname(os.path.abspath(__file__))
         self.env = os.path.join(self.root, "config", ".env")
         self.sql_path = os.path.join(self.root, "sql", "ses_query.sql")
         self.output = os.path.join(self.root, "output")
         self.logs = os.path.join(self.root, "logs")
-        self.today = date.today()
+        # Read the clock once so every date derived for this run agrees, even across midnight
+        self.started_at = now or datetime.now(timezone.utc)
+        self.today = self.started_at.astimezone().date()
         self.today_string = self.today.strftime("%Y%m%d")
         self.log_file = os.path.join(self.logs, f"{self.today_string}_LOG_FILE.txt")
         self.lock_file = os.path.join(self.root, "ses.lock")
@@ -28,18 +59,22 @@ class EnvConfig:
         os.makedirs(self.output, exist_ok=True)
         os.makedirs(self.logs, exist_ok=True)
 
-        # Setup logging
-        logging.basicConfig(
-            filename=self.log_file,
-            filemode='a',
-            level=logging.INFO,
-            format="%(asctime)s [%(levelname)s] %(message)s"
-        )
-        logging.info("Job started")
+        # Setup logging, capped at 10 MiB per file so a runaway day can't fill the disk
+        if not log.handlers:
+            handler = RotatingFileHandler(
+                self.log_file, mode="a", maxBytes=10 << 20, backupCount=7, encoding="utf-8"
+            )
+            handler.setFormatter(logging.Formatter(
+                "%(asctime)s.%(msecs)03d [%(levelname)s] %(message)s",
+                datefmt="%Y-%m-%dT%H:%M:%S",
+            ))
+            log.addHandler(handler)
+            log.setLevel(logging.INFO)
+        log.info("Job started")
 
         # Load environment variables
         load_dotenv(self.env)
-        logging.info("Environment loaded")
+        log.info("Environment loaded")
 
         # DB + SMTP configs
         self.db = {
@@ -53,11 +88,35 @@ class EnvConfig:
             "server": os.getenv("SMTP_SERVER"),
             "port": int(os.getenv("SMTP_PORT", "25")),
             "from": os.getenv("SMTP_FROM"),
-            "to": [a.strip() for a in os.getenv("SMTP_TO", "").split(",") if a.strip()]
+            "to": os.getenv("SMTP_TO", "").translate(_RECIPIENT_SEPARATORS).split()
         }
         self.mode = os.getenv("RUN_MODE", "DAILY").upper()
+        self.output_format = os.getenv("RUN_OUTPUT_FORMAT", "CSV").upper()
+        self.csv_gzip = bool(int(os.getenv("CSV_GZIP", "0")))
+        self.par_num = int(os.getenv("PAR_NUM", "1"))
+        self.csv_direct_write = bool(int(os.getenv("CSV_DIRECT_WRITE", "0")))
+        self.send_on_empty = bool(int(os.getenv("SEND_ON_EMPTY", "0")))
+        self.extract_mode = os.getenv("EXTRACT_MODE", "ORACLEDB").upper()
+        self.attach_mode = os.getenv("ATTACH_MODE", "INLINE").upper()
+        self.share_dir = os.getenv("SHARE_DIR")
+        self.share_url = os.getenv("SHARE_URL")
+        # Fail before extracting: once the reports and done markers exist, a rerun would skip them
+        if self.attach_mode == "LINK" and not (self.share_dir and os.path.isdir(self.share_dir)):
+            log.error("ATTACH_MODE=LINK needs SHARE_DIR set to an existing folder (got %r)", self.share_dir)
+            raise ValueError("ATTACH_MODE=LINK requires a valid SHARE_DIR")
         self.year_start_month = int(os.getenv("YEAR_START_MONTH", "1"))
 
+        # Read once; every report and slice executes this identical text, so
+        # Oracle hard-parses it once and pooled sessions reuse their cached cursor
+        with open(self.sql_path, "r", encoding="utf-8") as f:
+            self.sql_text = f.read()
+        # Every column is sized on the wire from its declared width, so `SELECT *`
+        # over the wide VARCHAR2 views multiplies the bytes fetched. Checked here,
+        # before any lock or connection, so it applies to every extract mode
+        if _SELECT_STAR.search(self.sql_text):
+            log.error("%s uses SELECT *; list the report columns explicitly", self.sql_path)
+            raise ValueError("Report SQL must list its columns explicitly, not SELECT *")
+
 
 # ─────────────────────────────
 # 2. Oracle Client
@@ -65,30 +124,141 @@ class EnvConfig:
 class OracleClient:
     def __init__(self, cfg: EnvConfig):
         self.cfg = cfg
-        self.conn = None
+        self.pool = None
         self.dsn = f"{cfg.db['host']}:{cfg.db['port']}/{cfg.db['service']}"
 
+    @staticmethod
+    def _init_session(conn, requested_tag):
+        # Keep parsed statements around so repeat executions are soft parses
+        conn.stmtcachesize = 40
+        conn.inputtypehandler = OracleClient._bind_date
+
+    @staticmethod
+    def _bind_date(cursor, value, arraysize):
+        """
+        Bind datetimes explicitly as DATE so every execution presents the same
+        bind types. DATE keeps the window predicate sargable whether
+        OPT_VIM_1LOG_START_DATE_TIME is a DATE or a TIMESTAMP column (a TIMESTAMP
+        bind against a DATE column would wrap the column in INTERNAL_FUNCTION and
+        lose the index range scan); the window bounds are whole seconds anyway.
+        """
+        if isinstance(value, datetime):
+            import oracledb
+            return cursor.var(oracledb.DB_TYPE_DATE, arraysize=arraysize)
+
     def connect(self):
+        """Create the session pool; logon is paid once per pooled session, not per query."""
+        # Imported here, like pyarrow below, so runs with nothing due skip loading the C extensions
+        import oracledb
         try:
-            self.conn = oracledb.connect(
+            self.pool = oracledb.create_pool(
                 user=self.cfg.db["user"],
                 password=self.cfg.db["pass"],
-                dsn=self.dsn
+                dsn=self.dsn,
+                min=1,
+                # Room for both reports with all their parallel slices at once
+                max=max(4, 2 * self.cfg.par_num),
+                increment=1,
+                session_callback=self._init_session,
             )
-            logging.info("Oracle connection successful")
+            log.info("Oracle connection pool created")
         except Exception as e:
-            logging.exception("Oracle connection failed")
+            log.exception("Oracle connection failed")
             raise
 
-    def query(self, sql_text, params=None):
-        df = pd.read_sql_query(sql_text, self.conn, params=params)
-        logging.info(f"Query returned {len(df):,} rows and {df.shape[1]} columns")
-        return df
+    def acquire(self):
+        """Borrow a pooled session; use as `with self.db.acquire() as conn:` to return it."""
+        return self.pool.acquire()
 
     def close(self):
-        if self.conn:
-            self.conn.close()
-            logging.info("Oracle connection closed")
+        if self.pool:
+            self.pool.close()
+            self.pool = None
+            log.info("Oracle connection pool closed")
+
+    def query(self, conn, sql_text, params=None, arraysize=10_000):
+        """Execute `sql_text` on `conn` and return (schema, batches).
+
+        Rows come through python-oracledb's native DataFrame fetch, which
+        builds Arrow columns straight from the wire (`arraysize` rows per
+        round-trip) with no Python object per cell. `batches` lazily yields
+        pyarrow Tables. The SQL must name its columns (checked in EnvConfig).
+        """
+        import pyarrow as pa
+        frames = conn.fetch_df_batches(sql_text, params or {}, size=arraysize)
+        first = next(frames, None)
+        if first is None:
+            return pa.schema([]), iter(())
+        first = pa.table(first)
+        return first.schema, self._batches(first, frames)
+
+    @staticmethod
+    def _batches(first, frames):
+        import pyarrow as pa
+        # An empty result still arrives as one zero-row frame; it only supplies the schema
+        if first.num_rows:
+            yield first
+        # Don't pin the first batch in this frame for the rest of the fetch
+        del first
+        for frame in frames:
+            yield pa.table(frame)
+
+    def spool_csv(self, sql_text, params, path):
+        """
+        Extract with SQL*Plus (12.2+) instead of the Python driver: the client
+        formats the CSV natively and spools it straight to `path`. Returns the
+        number of data rows written.
+        """
+        # SQL*Plus has no TIMESTAMP bind variables, so inline the window as DATE literals
+        for name, value in (params or {}).items():
+            sql_text = re.sub(
+                rf":{name}\b", f"TO_DATE('{value:%Y-%m-%d %H:%M:%S}', 'YYYY-MM-DD HH24:MI:SS')", sql_text
+            )
+        # SQL*Plus ignores SET TERMOUT OFF for commands piped on stdin, so the
+        # extract runs from a script file; otherwise every row is echoed back
+        # into our stdout buffer as well as the spool
+        script_path = f"{path}.sql"
+        with open(script_path, "w", encoding="utf-8") as f:
+            f.write("\n".join([
+                "SET TERMOUT OFF",
+                "SET DEFINE OFF",
+                "SET FEEDBACK OFF",
+                # Blank lines in the query must not end the statement early
+                "SET SQLBLANKLINES ON",
+                "SET MARKUP CSV ON QUOTE ON",
+                "ALTER SESSION SET NLS_DATE_FORMAT = 'YYYY-MM-DD HH24:MI:SS'",
+                "ALTER SESSION SET NLS_TIMESTAMP_FORMAT = 'YYYY-MM-DD HH24:MI:SS'",
+                f'SPOOL "{path}"',
+                sql_text.strip().rstrip(";") + ";",
+                "SPOOL OFF",
+                "",
+            ]))
+        # Only the logon goes over stdin, so the password never appears in the process list or on disk
+        session = "\n".join([
+            "WHENEVER SQLERROR EXIT SQL.SQLCODE",
+            "WHENEVER OSERROR EXIT FAILURE",
+            f'CONNECT {self.cfg.db["user"]}/"{self.cfg.db["pass"]}"@{self.dsn}',
+            f'@"{script_path}"',
+            "EXIT",
+        ])
+        try:
+            subprocess.run(
+                ["sqlplus", "-S", "-L", "/nolog"],
+                input=session, text=True, capture_output=True, check=True,
+                # Spool in UTF-8 whatever the client machine's default code page is
+                env={**os.environ, "NLS_LANG": ".AL32UTF8"},
+            )
+        except subprocess.CalledProcessError as e:
+            log.exception("SQL*Plus extract failed: %s", e.stdout.strip())
+            raise
+        finally:
+            os.remove(script_path)
+
+        # Parse rather than count newlines: quoted fields may contain line breaks
+        with open(path, newline="", encoding="utf-8", errors="replace") as f:
+            records = sum(1 for _ in csv.reader(f))
+        # Header line only appears when there is at least one row
+        return max(records - 1, 0)
 
 
 # ─────────────────────────────
@@ -97,22 +267,41 @@ class OracleClient:
 class FileManager:
     def __init__(self, cfg: EnvConfig):
         self.cfg = cfg
+        self._dirs: dict[str, str] = {}
 
     def base_dir(self, sub=""):
-        path = os.path.join(self.cfg.output, sub)
-        os.makedirs(path, exist_ok=True)
-        return path
+        # Created once per run; every path helper below goes through here
+        if sub not in self._dirs:
+            path = os.path.join(self.cfg.output, sub)
+            os.makedirs(path, exist_ok=True)
+            self._dirs[sub] = path
+        return self._dirs[sub]
+
+    def _listing(self, sub):
+        """Names in a report folder, read with a single directory scan."""
+        with os.scandir(self.base_dir(sub)) as entries:
+            return {entry.name for entry in entries}
+
+    @property
+    def parquet(self):
+        return self.cfg.output_format == "PARQUET"
+
+    @property
+    def ext(self):
+        if self.parquet:
+            return ".parquet"
+        return ".csv.gz" if self.cfg.csv_gzip else ".csv"
 
     def file_path(self, sub, suffix):
         return os.path.join(
             self.base_dir(sub),
-            f"{self.cfg.today_string}_QH_ServiceEntry_{suffix.upper()}.csv"
+            f"{self.cfg.today_string}_QH_ServiceEntry_{suffix.upper()}{self.ext}"
         )
 
     def temp_path(self, sub, suffix):
         return os.path.join(
             self.base_dir(sub),
-            f"_{self.cfg.today_string}_tmp_QH_ServiceEntry_{suffix.upper()}.csv"
+            f"_{self.cfg.today_string}_tmp_QH_ServiceEntry_{suffix.upper()}{self.ext}"
         )
 
     def done_marker(self, sub, suffix):
@@ -121,102 +310,204 @@ class FileManager:
             f"_DONE_{self.cfg.today_string}_{suffix.upper()}.txt"
         )
 
+    def write_path(self, sub, suffix):
+        """
+        Where the extract is streamed to. Normally a temp file renamed into
+        place when complete; with CSV_DIRECT_WRITE (for SMB shares, where the
+        rename is costly) the final path, relying on the done marker instead.
+        """
+        return self.file_path(sub, suffix) if self.cfg.csv_direct_write else self.temp_path(sub, suffix)
+
     def should_skip(self, sub, suffix):
-        if os.path.exists(self.file_path(sub, suffix)) or os.path.exists(self.done_marker(sub, suffix)):
-            logging.info(f"{suffix.capitalize()} already generated, skipping.")
+        names = self._listing(sub)
+        # A direct-written file may be partial, so only the done marker proves completion
+        final_exists = not self.cfg.csv_direct_write and os.path.basename(self.file_path(sub, suffix)) in names
+        if final_exists or os.path.basename(self.done_marker(sub, suffix)) in names:
+            log.info("%s already generated, skipping.", suffix.capitalize())
             return True
         return False
 
-    def write_csv(self, df, sub, suffix):
-        temp = self.temp_path(sub, suffix)
+    def _write_batches(self, path, schema, batches, include_header=True):
+        if self.parquet:
+            return self._write_parquet(path, schema, batches)
+        import pyarrow.csv as pa_csv
+        row_count = 0
+        # 4 MiB buffer: far fewer write syscalls than the 8 KiB default on large extracts
+        raw = open(path, "wb", buffering=4 << 20)
+        sink = gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=6) if self.cfg.csv_gzip else raw
+        # Arrow formats 1024 rows per chunk by default; larger chunks cut per-chunk overhead
+        options = pa_csv.WriteOptions(include_header=include_header, batch_size=64_000)
+        with raw, sink, pa_csv.CSVWriter(sink, schema, write_options=options) as writer:
+            for batch in batches:
+                writer.write(batch)
+                row_count += batch.num_rows
+        return row_count
+
+    @staticmethod
+    def _write_parquet(path, schema, batches):
+        import pyarrow.parquet as pq
+        # zstd is compressed inside the file, so CSV_GZIP does not apply here
+        row_count = 0
+        with pq.ParquetWriter(path, schema, compression="zstd", use_dictionary=True) as writer:
+            for batch in batches:
+                writer.write(batch)
+                row_count += batch.num_rows
+        return row_count
+
+    def _finalize(self, path, sub, suffix, row_count):
         final = self.file_path(sub, suffix)
-        df.to_csv(temp, index=False)
-        os.replace(temp, final)
-        open(self.done_marker(sub, suffix), "w").write("done")
-        logging.info(f"Wrote {len(df):,} rows → {final}")
-        return final
+        if path != final:
+            os.replace(path, final)
+        Path(self.done_marker(sub, suffix)).touch()
+        log.info("Wrote %s rows → %s", f"{row_count:,}", final)
+        return final, row_count
+
+    def write_csv_from_batches(self, schema, batches, sub, suffix):
+        """Write record batches to one CSV as they arrive; returns (path, row_count)."""
+        path = self.write_path(sub, suffix)
+        row_count = self._write_batches(path, schema, batches)
+        return self._finalize(path, sub, suffix, row_count)
+
+    def publish(self, path):
+        """Copy a finished report to SHARE_DIR and return the URL to mail out."""
+        dest = os.path.join(self.cfg.share_dir, os.path.basename(path))
+        shutil.copyfile(path, dest)
+        if self.cfg.share_url:
+            url = f"{self.cfg.share_url.rstrip('/')}/{quote(os.path.basename(path))}"
+        else:
+            url = Path(os.path.abspath(dest)).as_uri()
+        log.info("Published %s → %s", path, url)
+        return url
+
+    def write_spooled(self, spool, sub, suffix, row_count):
+        """Move a CSV written outside Python into place, gzipping (or converting to parquet) first if configured."""
+        path = self.write_path(sub, suffix)
+        if self.parquet:
+            try:
+                self._spool_to_parquet(spool, path)
+            finally:
+                os.remove(spool)
+        elif self.cfg.csv_gzip:
+            with open(spool, "rb") as src, gzip.open(path, "wb", compresslevel=6) as dst:
+                shutil.copyfileobj(src, dst, 1 << 20)
+            os.remove(spool)
+        else:
+            os.replace(spool, path)
+        return self._finalize(path, sub, suffix, row_count)
+
+    def _spool_to_parquet(self, spool, path):
+        import pyarrow as pa
+        import pyarrow.csv as pa_csv
+        # spool_csv pins NLS_LANG to AL32UTF8; anything else can't become parquet strings
+        not_utf8 = f"SQL*Plus spool {spool} is not UTF-8; spool it with NLS_LANG=.AL32UTF8"
+        try:
+            with open(spool, newline="", encoding="utf-8") as f:
+                header = next(csv.reader(f), [])
+        except UnicodeDecodeError as e:
+            raise ValueError(not_utf8) from e
+        if not header:
+            self._write_parquet(path, pa.schema([]), [])
+            return
+        # Arrow infers types from the first block only, so a column that starts out
+        # empty becomes `null` and fails on its first later value; keep the text as spooled
+        options = pa_csv.ConvertOptions(column_types={name: pa.string() for name in header})
+        try:
+            with pa_csv.open_csv(spool, convert_options=options) as reader:
+                self._write_parquet(path, reader.schema, reader)
+        except pa.ArrowInvalid as e:
+            if "UTF8" in str(e):
+                raise ValueError(not_utf8) from e
+            raise
+
+    def write_part(self, schema, batches, sub, suffix, index):
+        """Write one slice of a partitioned extract; only slice 0 carries the header."""
+        part = f"{self.temp_path(sub, suffix)}.part{index}"
+        return part, self._write_batches(part, schema, batches, include_header=index == 0)
+
+    def join_parts(self, parts, sub, suffix):
+        """Concatenate (part, row_count) slices in order into the final file."""
+        path = self.write_path(sub, suffix)
+        if self.parquet:
+            return self._join_parquet(parts, path, sub, suffix)
+        # Byte-level concatenation also works for gzip: a multi-member stream is still valid gzip
+        with open(path, "wb", buffering=4 << 20) as out:
+            for part, _ in parts:
+                with open(part, "rb") as f:
+                    shutil.copyfileobj(f, out, 1 << 20)
+                os.remove(part)
+        return self._finalize(path, sub, suffix, sum(n for _, n in parts))
+
+    def _join_parquet(self, parts, path, sub, suffix):
+        import pyarrow.parquet as pq
+        # Parquet files can't be byte-concatenated; copy each part's row groups into one file
+        files = [pq.ParquetFile(part) for part, _ in parts]
+        schema = next((f.schema_arrow for f, (_, n) in zip(files, parts) if n), files[0].schema_arrow)
+        row_count = self._write_parquet(
+            path, schema, (batch for f in files for batch in f.iter_batches(batch_size=64_000))
+        )
+        for f, (part, _) in zip(files, parts):
+            f.close()
+            os.remove(part)
+        return self._finalize(path, sub, suffix, row_count)
 
 
 # ─────────────────────────────
 # 4. Email Client
 # ─────────────────────────────
-class EmailClient:
-    def __init__(self, cfg: EnvConfig):
-        self.cfg = cfg
+# Static parts of the email bodies, built once at import; only the
+# per-run values are substituted in build_body.
+_TEXT_TEMPLATE = Template("""\
+Service Entry Sheet Report
 
-    def build_body(self, sections, generated_at: datetime | None = None, tzinfo=timezone.utc):
-        """
-        sections: list of dicts like:
-        {"title": "Weekly", "window": "07 Oct 2025 → 14 Oct 2025", "rows": 1593}
-        {"title": "Monthly (YTD through Oct 2025)", "window": "01 Jan 2025 → 01 Nov 2025", "rows": 8214}
-        """
-        if generated_at is None:
-            generated_at = datetime.now(timezone.utc)
-        if generated_at.tzinfo is None:
-            generated_at = generated_at.replace(tzinfo=timezone.utc)
-        gen_str = generated_at.astimezone(tzinfo).strftime("%Y-%m-%d %H:%M:%S %Z")
+${sections}Notes:
+- This report was generated automatically.
+- For questions about process, completeness, or data accuracy, email ap_operations@health.qld.gov.au
 
-        # ---------- Plain text ----------
-        text_lines = ["Service Entry Sheet Report", ""]
-        for s in sections:
-            text_lines.append(s["title"])
-            text_lines.append(f"• Window: {s['window']}")
-            text_lines.append(f"• Rows: {s['rows']:,}")
-            text_lines.append("")  # spacer
-        text_lines.extend([
-            "Notes:",
-            "- This report was generated automatically.",
-            "- For questions about process, completeness, or data accuracy, email ap_operations@health.qld.gov.au",
-            "",
-            f"Time Generated: {gen_str}",
-            "",
-            "Thank you,",
-            "AP Operations, Queensland Health",
-        ])
-        text_body = "\n".join(text_lines)
+Time Generated: ${gen_str}
 
-        # ---------- HTML ----------
-        def card_html(title, window, rows):
-            return f"""
+Thank you,
+AP Operations, Queensland Health""")
+
+_CARD_TEMPLATE = """
             <div class="card">
             <h3>{title}</h3>
             <table role="presentation" aria-hidden="true">
                 <tr><th>Window</th><td>{window}</td></tr>
-                <tr><th>Rows</th><td>{rows:,}</td></tr>
+                <tr><th>Rows</th><td>{rows:,}</td></tr>{link_row}
             </table>
             </div>
             """
 
-        cards_html = "\n".join(card_html(s["title"], s["window"], s["rows"]) for s in sections)
+_LINK_ROW_TEMPLATE = '\n                <tr><th>Download</th><td><a href="{link}">{link}</a></td></tr>'
 
-        html_body = f"""\
+_HTML_TEMPLATE = Template("""\
     <!DOCTYPE html>
     <html>
     <head>
         <meta charset="utf-8">
         <title>Service Entry Sheet Report</title>
         <style>
-        body {{ margin:0; padding:0; background:#f9fafb; }}
-        .container {{ font-family: Arial, Helvetica, sans-serif; font-size:14px; color:#1f2937; padding:16px; }}
-        .heading {{ font-size:22px; margin:0 0 12px 0; color:#111827; }}
-        .card {{ background:#ffffff; border:1px solid #e5e7eb; border-radius:6px; padding:16px; margin:12px 0; }}
-        h3 {{ margin:0 0 8px 0; font-size:16px; }}
-        table {{ border-collapse:collapse; width:100%; }}
-        th, td {{ border:1px solid #e5e7eb; padding:8px; text-align:left; font-size:13px; }}
-        .note {{ background:#f3f4f6; border:1px solid #e5e7eb; border-radius:4px; padding:10px; margin-top:12px; }}
-        .footer {{ margin-top:16px; font-size:12px; color:#6b7280; }}
-        a {{ color:#2563eb; text-decoration:none; }}
+        body { margin:0; padding:0; background:#f9fafb; }
+        .container { font-family: Arial, Helvetica, sans-serif; font-size:14px; color:#1f2937; padding:16px; }
+        .heading { font-size:22px; margin:0 0 12px 0; color:#111827; }
+        .card { background:#ffffff; border:1px solid #e5e7eb; border-radius:6px; padding:16px; margin:12px 0; }
+        h3 { margin:0 0 8px 0; font-size:16px; }
+        table { border-collapse:collapse; width:100%; }
+        th, td { border:1px solid #e5e7eb; padding:8px; text-align:left; font-size:13px; }
+        .note { background:#f3f4f6; border:1px solid #e5e7eb; border-radius:4px; padding:10px; margin-top:12px; }
+        .footer { margin-top:16px; font-size:12px; color:#6b7280; }
+        a { color:#2563eb; text-decoration:none; }
         </style>
     </head>
     <body>
         <div class="container">
         <h2 class="heading">Service Entry Sheet Report</h2>
 
-        {cards_html}
+        ${cards}
 
         <div class="card">
             <table role="presentation" aria-hidden="true">
-            <tr><th>Time Generated</th><td>{gen_str}</td></tr>
+            <tr><th>Time Generated</th><td>${gen_str}</td></tr>
             </table>
         </div>
 
@@ -236,10 +527,160 @@ class EmailClient:
         </div>
     </body>
     </html>
-    """
+    """)
+
+
+class EmailClient:
+    def __init__(self, cfg: EnvConfig):
+        self.cfg = cfg
+        self._smtp = None
+
+    def _connection(self):
+        """Return the cached SMTP session, reconnecting if the server dropped it."""
+        if self._smtp is not None:
+            try:
+                if self._smtp.noop()[0] == 250:
+                    return self._smtp
+            except (smtplib.SMTPException, OSError):
+                pass
+            log.info("SMTP session lost, reconnecting")
+            self.close()
+
+        self._smtp = smtplib.SMTP(self.cfg.smtp["server"], self.cfg.smtp["port"], timeout=30)
+        # Don't let Nagle hold back the pipelined command block
+        self._smtp.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._smtp.ehlo()
+        return self._smtp
+
+    def _deliver(self, server, msg):
+        """
+        Send `msg` to every configured recipient. When the server advertises
+        PIPELINING (RFC 2920), MAIL FROM and all RCPT TO commands go out in a
+        single write and their replies are read afterwards, so the envelope
+        costs one round-trip instead of one per command.
+        """
+        sender = self.cfg.smtp["from"]
+        # One RCPT per address, so the all-refused check below counts correctly
+        recipients = list(dict.fromkeys(self.cfg.smtp["to"]))
+        payload = msg.as_bytes(policy=policy.SMTP)
+        # Bodies and CSV attachments may be 8bit; declare it when the relay supports it
+        mail_options = ["BODY=8BITMIME"] if server.has_extn("8bitmime") else []
+        if not server.has_extn("pipelining"):
+            # sendmail adds SIZE itself and raises only when every recipient is refused
+            refused = server.sendmail(sender, recipients, payload, mail_options)
+            if refused:
+                log.warning("Recipients refused: %s", refused)
+            return
+
+        # Let the relay reject an oversized message before we stream it, as sendmail does
+        if server.has_extn("size"):
+            mail_options.append(f"SIZE={len(payload)}")
+        mail_cmd = " ".join([f"MAIL FROM:<{sender}>", *mail_options])
+        server.send(f"{mail_cmd}\r\n" + "".join(f"RCPT TO:<{r}>\r\n" for r in recipients))
+        # Every pipelined command gets a reply, so drain them all before acting on any
+        mail_reply = server.getreply()
+        rcpt_replies = {r: server.getreply() for r in recipients}
+        if mail_reply[0] != 250:
+            server.rset()
+            raise smtplib.SMTPSenderRefused(*mail_reply, sender)
+        refused = {r: reply for r, reply in rcpt_replies.items() if reply[0] not in (250, 251)}
+        if len(refused) == len(recipients):
+            server.rset()
+            raise smtplib.SMTPRecipientsRefused(refused)
+
+        code, resp = server.data(payload)
+        if code != 250:
+            server.rset()
+            raise smtplib.SMTPDataError(code, resp)
+        if refused:
+            log.warning("Recipients refused: %s", refused)
+
+    def __enter__(self):
+        """Open the SMTP session once; send() can then be called any number of times."""
+        self._connection()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except (smtplib.SMTPException, OSError):
+                self._smtp.close()
+            self._smtp = None
+
+    def build_body(self, sections, generated_at: datetime | None = None, tzinfo=timezone.utc):
+        """
+        sections: list of dicts like:
+        {"title": "Weekly", "window": "07 Oct 2025 → 14 Oct 2025", "rows": 1593}
+        {"title": "Monthly (YTD through Oct 2025)", "window": "01 Jan 2025 → 01 Nov 2025", "rows": 8214}
+        An optional "link" key adds a download link for reports published to a share.
+        """
+        if generated_at is None:
+            generated_at = self.cfg.started_at
+        if generated_at.tzinfo is None:
+            generated_at = generated_at.replace(tzinfo=timezone.utc)
+        gen_str = generated_at.astimezone(tzinfo).strftime("%Y-%m-%d %H:%M:%S %Z")
+
+        # ---------- Plain text ----------
+        text_sections = "".join(
+            f"{s['title']}\n• Window: {s['window']}\n• Rows: {s['rows']:,}\n"
+            + (f"• Download: {s['link']}\n" if s.get("link") else "")
+            + "\n"
+            for s in sections
+        )
+        text_body = _TEXT_TEMPLATE.substitute(sections=text_sections, gen_str=gen_str)
+
+        # ---------- HTML ----------
+        cards_html = "\n".join([
+            _CARD_TEMPLATE.format_map({
+                **s,
+                "link_row": _LINK_ROW_TEMPLATE.format(link=s["link"]) if s.get("link") else "",
+            })
+            for s in sections
+        ])
+
+        html_body = _HTML_TEMPLATE.substitute(cards=cards_html, gen_str=gen_str)
         return text_body, html_body
 
+    @staticmethod
+    def _attach_csv(msg, data, filename, server):
+        """
+        Attach a plain CSV as text/csv in the lightest transfer encoding the
+        content and relay allow, instead of base64 (+33% on the wire).
+        """
+        # RFC 5322 caps lines at 998 octets for 7bit/8bit bodies. Anchored to line
+        # starts, so the scan stays linear instead of retrying from every byte
+        has_long_lines = _LONG_LINE.search(data) is not None
+        try:
+            text, cte = str(data, "ascii"), "7bit"
+        except UnicodeDecodeError:
+            try:
+                text, cte = str(data, "utf-8"), "8bit" if server.has_extn("8bitmime") else "quoted-printable"
+            except UnicodeDecodeError:
+                # e.g. a SQL*Plus spool in the client's Windows code page: send the bytes as-is
+                msg.add_attachment(bytes(data), maintype="text", subtype="csv", filename=filename)
+                return
+        if has_long_lines:
+            cte = "quoted-printable"
+        msg.add_attachment(text, subtype="csv", filename=filename, cte=cte)
+
+    def _attach(self, msg, data, apath, server):
+        filename = os.path.basename(apath)
+        if apath.endswith(".csv"):
+            self._attach_csv(msg, data, filename, server)
+            return
+        msg.add_attachment(
+            data,
+            maintype="application",
+            subtype=_ATTACHMENT_SUBTYPES.get(os.path.splitext(apath)[1], "octet-stream"),
+            filename=filename,
+        )
+
     def send(self, subject, text_body, html_body, attachments):
+        server = self._connection()
         msg = EmailMessage()
         msg["Subject"] = subject
         msg["From"] = self.cfg.smtp["from"]
@@ -248,18 +689,17 @@ class EmailClient:
         msg.add_alternative(html_body, subtype="html")
 
         for apath in attachments:
-            with open(apath, "rb") as f:
-                data = f.read()
-            msg.add_attachment(
-                data,
-                maintype="application",
-                subtype="octet-stream",
-                filename=os.path.basename(apath),
-            )
+            # mmap refuses zero-length files (e.g. an empty SQL*Plus spool)
+            if os.path.getsize(apath) == 0:
+                self._attach(msg, b"", apath, server)
+                continue
+            # Map the file rather than read() it, so only the encoded MIME part is held in memory
+            with open(apath, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, \
+                    memoryview(mm) as data:
+                self._attach(msg, data, apath, server)
 
-        with smtplib.SMTP(self.cfg.smtp["server"], self.cfg.smtp["port"], timeout=30) as s:
-            s.send_message(msg)
-            logging.info(f"Email sent successfully to {len(self.cfg.smtp['to'])} recipients")
+        self._deliver(server, msg)
+        log.info("Email sent successfully to %d recipients", len(self.cfg.smtp["to"]))
 
 
 # ─────────────────────────────
@@ -286,54 +726,153 @@ class ServiceEntryRunner:
         end = datetime.combine(self.today, time.min)
         return start, end
 
+    def extract(self, sql_text, start, end, sub, suffix):
+        """
+        Run the report query over [start, end) and write it out; returns
+        (path, row_count). path is None if the result was empty and
+        SEND_ON_EMPTY is off, in which case no file is created.
+        """
+        if self.cfg.extract_mode == "SQLPLUS":
+            spool = f"{self.fm.temp_path(sub, suffix)}.spool"
+            row_count = self.db.spool_csv(sql_text, {"start_date_ts": start, "end_date_ts": end}, spool)
+            if row_count == 0 and not self.cfg.send_on_empty:
+                log.info("%s returned no rows, skipping CSV", suffix.capitalize())
+                os.remove(spool)
+                return None, 0
+            return self.fm.write_spooled(spool, sub, suffix, row_count)
+
+        if self.cfg.par_num <= 1:
+            with self.db.acquire() as conn:
+                schema, batches = self.db.query(conn, sql_text, {"start_date_ts": start, "end_date_ts": end})
+                first = next(batches, None)
+                if first is None and not self.cfg.send_on_empty:
+                    log.info("%s returned no rows, skipping CSV", suffix.capitalize())
+                    return None, 0
+                batches = itertools.chain([first] if first is not None else [], batches)
+                # Only the chain holds the peeked batch now, so it is freed once written
+                del first
+                return self.fm.write_csv_from_batches(schema, batches, sub, suffix)
+
+        # Split the window into whole-second time slices and fetch each on its own
+        # session. Joining the slices in order keeps the ORDER BY on start time intact.
+        n = self.cfg.par_num
+        step = timedelta(seconds=(end - start).total_seconds() // n)
+        bounds = [start + step * i for i in range(n)] + [end]
+        log.info("Fetching %s in %d parallel slices", suffix.lower(), n)
+
+        def fetch(i):
+            with self.db.acquire() as conn:
+                params = {"start_date_ts": bounds[i], "end_date_ts": bounds[i + 1]}
+                schema, batches = self.db.query(conn, sql_text, params)
+                return self.fm.write_part(schema, batches, sub, suffix, i)
+
+        with ThreadPoolExecutor(max_workers=n) as pool:
+            parts = list(pool.map(fetch, range(n)))
+        # Same rule as the single-session path: no rows, no file
+        if sum(rows for _, rows in parts) == 0 and not self.cfg.send_on_empty:
+            log.info("%s returned no rows, skipping CSV", suffix.capitalize())
+            for part, _ in parts:
+                os.remove(part)
+            return None, 0
+        return self.fm.join_parts(parts, sub, suffix)
+
+    def run_report(self, sub, suffix, title, window):
+        """Extract one report; returns (path, section) for the email."""
+        start, end = window
+        path, row_count = self.extract(self.cfg.sql_text, start, end, sub, suffix)
+        return path, {
+            "title": title,
+            "window": f"{start:%d %b %Y} → {end:%d %b %Y}",
+            "rows": row_count,
+            "file": path,
+        }
+
+    def _acquire_lock(self):
+        """
+        Take an exclusive, non-blocking lock on the lock file; returns its fd, or
+        None if another run holds it. The OS drops the lock if the process dies,
+        so a crash can no longer leave a stale lock behind.
+        """
+        fd = os.open(self.cfg.lock_file, os.O_CREAT | os.O_RDWR, 0o644)
+        try:
+            if fcntl:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+        except OSError:
+            os.close(fd)
+            return None
+        return fd
+
+    @staticmethod
+    def _release_lock(fd):
+        if fcntl:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        else:
+            os.lseek(fd, 0, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+        os.close(fd)
+
     def run(self):
-        if os.path.exists(self.cfg.lock_file):
-            logging.info("Lock file detected, skipping run.")
+        lock_fd = self._acquire_lock()
+        if lock_fd is None:
+            log.info("Lock held by another run, skipping.")
             return
+        try:
+            self._run()
+        finally:
+            self._release_lock(lock_fd)
 
-        open(self.cfg.lock_file, "w").close()
+    def _run(self):
         weekly_due, monthly_due = self.what_is_due()
         if not weekly_due and not monthly_due:
-            logging.info("No reports due today.")
-            os.remove(self.cfg.lock_file)
+            log.info("No reports due today.")
             return
 
-        self.db.connect()
-        with open(self.cfg.sql_path, "r", encoding="utf-8") as f:
-            sql_text = f.read()
-
-        # Collect both: attachments for the email + structured sections for the body
-        attachments, sections = [], []
-
-        # Weekly
+        due = []
         if weekly_due and not self.fm.should_skip("weekly", "WEEKLY"):
-            ws, we = self.weekly_window()
-            df_w = self.db.query(sql_text, {"start_date_ts": ws, "end_date_ts": we})
-            attachments.append(self.fm.write_csv(df_w, "weekly", "WEEKLY"))
-
-            sections.append({
-                "title": "Weekly",
-                "window": f"{ws:%d %b %Y} → {we:%d %b %Y}",
-                "rows": len(df_w),
-            })
-
-        # Monthly
+            due.append(("weekly", "WEEKLY", "Weekly", self.weekly_window()))
         if monthly_due and not self.fm.should_skip("monthly", "MONTHLY"):
-            ms, me = self.monthly_window()
-            df_m = self.db.query(sql_text, {"start_date_ts": ms, "end_date_ts": me})
-            attachments.append(self.fm.write_csv(df_m, "monthly", "MONTHLY"))
-
             prev_label = (self.today.replace(day=1) - timedelta(days=1)).strftime("%b %Y")
-            sections.append({
-                "title": f"Monthly (YTD through {prev_label})",
-                "window": f"{ms:%d %b %Y} → {me:%d %b %Y}",
-                "rows": len(df_m),
-            })
+            due.append(("monthly", "MONTHLY", f"Monthly (YTD through {prev_label})", self.monthly_window()))
+
+        # SQL*Plus extracts open their own session
+        if due and self.cfg.extract_mode != "SQLPLUS":
+            self.db.connect()
+
+        # The reports are independent, so on combined days run them side by side,
+        # each on its own session: wall time is the slower report, not the sum
+        try:
+            with ThreadPoolExecutor(max_workers=max(len(due), 1)) as pool:
+                results = list(pool.map(lambda job: self.run_report(*job), due))
+        finally:
+            self.db.close()
+
+        # Collect both: attachments for the email + structured sections for the body
+        attachments = [path for path, _ in results if path]
+        sections = [section for _, section in results]
 
         # If nothing generated
-        if not attachments:
-            logging.info("All reports already generated for today. Nothing to send.")
-            os.remove(self.cfg.lock_file)
+        if not sections:
+            log.info("All reports already generated for today. Nothing to send.")
+            return
+
+        # Nothing worth reporting (e.g. public holidays)
+        if not any(s["rows"] for s in sections) and not self.cfg.send_on_empty:
+            log.info("Empty result, skipping email")
+            return
+
+        # Link mode: publish to the share and mail links instead of attachments,
+        # keeping large reports under relay size limits
+        if self.cfg.attach_mode == "LINK":
+            for section in sections:
+                if section["file"]:
+                    section["link"] = self.fm.publish(section["file"])
+            attachments = []
+
+        # Reports are on disk either way; don't render or "send" to nobody
+        if not self.cfg.smtp["to"]:
+            log.warning("No SMTP recipients configured; skipping send")
             return
 
         # Subject line
@@ -348,21 +887,19 @@ class ServiceEntryRunner:
         # Build bodies (text + HTML) from structured sections
         text_body, html_body = self.email.build_body(
             sections,
-            generated_at=datetime.now(timezone.utc)
+            generated_at=self.cfg.started_at
         )
 
         # Send
-        self.email.send(subject, text_body, html_body, attachments)
-
+        with self.email as email:
+            email.send(subject, text_body, html_body, attachments)
 
-        self.db.close()
-        if os.path.exists(self.cfg.lock_file):
-            os.remove(self.cfg.lock_file)
-        logging.info("Run completed successfully")
+        log.info("Run completed successfully")
 
 # ─────────────────────────────
 # Entry Point
 # ─────────────────────────────
 if __name__ == "__main__":
     cfg = EnvConfig()
-    ServiceEntryRunner(cfg).run()
+    runner = ServiceEntryRunner(cfg)
+    runner.run()
@@ -0,0 +1,45 @@
+-- Access-path check for ses_query.sql.
+-- The date filter is half-open on the raw column (>= start, < end) with no
+-- function wrapped around it, so Oracle can range-scan an index on
+-- OPT_VIM_1LOG_START_DATE_TIME. Confirm the plan shows an INDEX RANGE SCAN
+-- on that column rather than a full scan of the 1LOG view's base table.
+-- Keep the statement below in sync with ses_query.sql.
+
+-- The window is bound as DATE (run.py, OracleClient._bind_date). Check the
+-- column type: DATE or TIMESTAMP both keep the range scan with a DATE bind.
+SELECT DATA_TYPE
+FROM ALL_TAB_COLUMNS
+WHERE OWNER = 'DSS'
+AND TABLE_NAME = 'VIM_OPT_VIM_1LOG_VW'
+AND COLUMN_NAME = 'OPT_VIM_1LOG_START_DATE_TIME';
+
+EXPLAIN PLAN SET STATEMENT_ID = 'SES_QUERY' FOR
+SELECT 
+    h.DOCID AS "Document Number",
+    h.BELNR_FI AS "Accounting Document Number",
+    h.BUKRS AS "Company Code",
+    h.EBELN AS "Purchasing Document Number",
+    l.OPT_VIM_1LOG_FUNC_TEXT AS "Activity",
+    l.OPT_VIM_1LOG_ACTUAL_ROLE AS "Actual Role",
+    l.OPT_VIM_1LOG_ACTUAL_AGENT AS "Actual Agent",
+    l.OPT_VIM_1LOG_START_DATE_TIME AS "Start Date & Time",
+    t.PROC_TYPE AS "Process Type Number",
+    t.OBJTXT AS "Process Type Text"
+FROM
+DSS.VIM_OPT_VIM_1LOG_VW l
+JOIN 
+DSS.VIM_1HEAD_2HEAD_VW h 
+ON 
+l.OPT_VIM_1LOG_DOCID = h.DOCID
+JOIN
+DSS.VIM_STG_T800T_VW t
+ON
+l.OPT_VIM_1LOG_PROCESS_TYPE = t.PROC_TYPE
+WHERE
+l.OPT_VIM_1LOG_FUNC_TEXT = 'Bypassed Rule -QH - Service Entry Requir'
+AND l.OPT_VIM_1LOG_START_DATE_TIME >= :start_date_ts
+AND l.OPT_VIM_1LOG_START_DATE_TIME < :end_date_ts
+ORDER BY
+l.OPT_VIM_1LOG_START_DATE_TIME;
+
+SELECT * FROM TABLE(DBMS_XPLAN.DISPLAY(NULL, 'SES_QUERY', 'TYPICAL'));